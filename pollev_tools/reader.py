@@ -1,18 +1,53 @@
 import argparse
 import os
+import re
+import numpy as np
 import pandas as pd
 import yaml
+import toml
 import json
-import random
+import codecs
 import configparser
+import itertools
 import shutil
+import html
 from collections import OrderedDict
+from functools import lru_cache, partial
 import uuid
 
 TEX_CHARS_ESCAPE = ['%']
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)     # libyaml (C) emitter when PyYAML was built with it
 QUESTION_START_CHARS = [')', '.', ']', '&']
+REMOVE_START_LEN = 4
+WRITE_BUFFERING = 1 << 20       # buffer size for the reports streamed with writelines
+PARALLEL_MIN_ROWS = 50000       # below this many questions, rendering in worker processes costs more than it saves
 
-def remove_question_start(s: str, max_len: int):
+@lru_cache(maxsize=None)
+def question_start_regex(max_len: int, delim: str = None) -> re.Pattern:
+    """
+    Compiles the regex used to remove the start of a question or response.
+
+    a) <- this form
+
+    :param max_len: How long a substring the regex should look for the characters in
+    :param delim: If given, the prefix is also matched after every occurrence of this delimiter
+
+    :return: Compiled pattern (cached per max_len and delim)
+    """
+    chars = re.escape(''.join(QUESTION_START_CHARS))
+    if delim is None:
+        start, body, spaces = '^', f'[^{chars}]', ' *'
+    else:
+        delim = re.escape(delim)
+        # the trailing spaces stop at the delimiter, which may itself start with a space
+        start, body, spaces = f'(?:^|(?<={delim}))', f'(?:(?!{delim})[^{chars}])', f'(?:(?!{delim}) )*'
+
+    return re.compile(f'{start}{body}{{0,{max_len}}}[{chars}]{spaces}')
+
+# compiled at import for the default length, so scalar calls skip the cache lookup
+QUESTION_START_REGEX = question_start_regex(REMOVE_START_LEN)
+
+def remove_question_start(s: str, max_len: int = REMOVE_START_LEN):
     """
     Removes the start of a question. 
 
@@ -23,21 +58,31 @@ def remove_question_start(s: str, max_len: int):
 
     :return: Modified string
     """
-    for x in QUESTION_START_CHARS:
-        try:
-            ind = s.index(x)
-            if ind <= max_len:
-                s = s[ind+1:]
-
-                # try to remove starting spaces
-                while s[0] == " ":
-                    s = s[1:]
-                break
-        except ValueError:
-            pass
-        except IndexError:
-            pass
-    return s
+    pattern = QUESTION_START_REGEX if max_len == REMOVE_START_LEN else question_start_regex(max_len)
+    m = pattern.match(s)
+    return s[m.end():] if m else s
+
+def shuffle_lists(s: pd.Series, rng: np.random.Generator = None) -> pd.Series:
+    """
+    Shuffles every list in a Series with one NumPy sort over all the flattened items.
+
+    :param s: Series of lists
+    :param rng: The random generator to use (a fresh default_rng if not given)
+
+    :return: Series of shuffled lists (same index)
+    """
+    if len(s) == 0:
+        return s
+
+    rng = rng or np.random.default_rng()
+    lengths = np.fromiter(map(len, s), dtype=np.intp, count=len(s))
+    flat = np.fromiter(itertools.chain.from_iterable(s), dtype=object, count=lengths.sum())
+
+    # sort by row first, then by a random key within the row
+    row_idx = np.repeat(np.arange(len(s)), lengths)
+    flat = flat[np.lexsort((rng.random(len(flat)), row_idx))]
+
+    return pd.Series([x.tolist() for x in np.split(flat, np.cumsum(lengths)[:-1])], index=s.index)
 
 def read_csv_file(
         file_path,
@@ -49,11 +94,16 @@ def read_csv_file(
         activity_type_col: str = 'Activity type',
         response_col: str = 'Response options',
         multiple_choice_type: str = 'Multiple choice',
-        remove_start_len: int = 4,
+        remove_start_len: int = REMOVE_START_LEN,
         response_options_delim: str = " | ", 
         image_in_str: str = '(an image)',
         correct_in_response: str = '(Correct)',
         shuffle: bool = True,
+        seed: int = None,
+        chunksize: int = 262144,
+        need_split: bool = True,
+        trim_columns: bool = False,
+        engine: str = None,
         **kwargs
     ):
     """
@@ -62,66 +112,197 @@ def read_csv_file(
     :param file_path: The CSV file path (to read)
     :param presenter: The presenter to filter by
     :param rhidden: Whether or not to remove hidden question titles
+    :param seed: Seed for shuffling the response options (reproducible output)
+    :param chunksize: How many rows to read at a time (only the kept rows of each chunk stay in memory)
+    :param need_split: Whether or not to build the split_responses/split_correct_responses columns (not needed for CSV output)
+    :param trim_columns: Whether or not to only parse the presenter, type, title and response columns (the rest are dropped)
+    :param engine: The read_csv parser engine ('pyarrow' parses multi-threaded, but reads the file in one piece)
     :param kwargs: Any keyword arguments for read_csv
 
     :return: The read data in a dataframe
     """
 
-    data_df = pd.read_csv(file_path, **kwargs)
-    if presenter is not None:
-        data_df = data_df[data_df[presenter_col] == presenter]
+    use_arrow = engine == 'pyarrow'
 
-    data_df = data_df[data_df[activity_type_col] == multiple_choice_type]
+    # the question-based transforms only read these columns, so they can skip parsing the rest (pyarrow is columnar anyway)
+    if trim_columns and 'usecols' not in kwargs and not use_arrow:
+        wanted = {presenter_col, question_col, activity_type_col, response_col}
+        kwargs['usecols'] = lambda c: c in wanted
 
-    # remove the start of the question title
-    data_df[question_col] = data_df[question_col].apply(lambda x: remove_question_start(x, remove_start_len))
+    # parse the filter columns straight into categoricals, so the comparisons below are on integer codes
+    # (a single dtype for every column, e.g. dtype=str, is passed through as given)
+    dtype = kwargs.get('dtype')
+    if dtype is None or isinstance(dtype, dict):
+        kwargs['dtype'] = {presenter_col: 'category', activity_type_col: 'category', **(dtype or {})}
 
-    # remove hidden entries
-    if rhidden:
-        data_df = data_df[data_df[question_col] != "~hidden~"]
+    def filter_chunk(chunk):
+        mask = chunk[activity_type_col] == multiple_choice_type
+        if presenter is not None:
+            mask &= chunk[presenter_col] == presenter
+        return chunk[mask]
 
-    
-
-    # remove image entries
-    if rimages:
-        data_df = data_df[~(data_df[question_col].str.contains(image_in_str) | data_df[response_col].str.contains(image_in_str))]
+    if use_arrow:
+        # the pyarrow engine doesn't support chunksize
+        chunks = [pd.read_csv(file_path, engine=engine, **kwargs)]
+    else:
+        chunks = pd.read_csv(file_path, engine=engine, chunksize=chunksize, **kwargs)
 
+    data_df = pd.concat([filter_chunk(chunk) for chunk in chunks])
 
-    # split and maybe shuffle
+    # remove the start of the question title
+    data_df[question_col] = data_df[question_col].str.replace(question_start_regex(remove_start_len), '', n=1, regex=True)
+
+    # remove hidden and image entries (with a single mask)
+    if rhidden or rimages:
+        mask = pd.Series(True, index=data_df.index)
+        if rhidden:
+            mask &= data_df[question_col].ne("~hidden~")
+        if rimages:
+            # one literal (non-regex) scan over title and responses joined together
+            combined = data_df[question_col].str.cat(data_df[response_col], sep='\x00')
+            mask &= ~combined.str.contains(image_in_str, regex=False, na=False)
+        data_df = data_df[mask]
+
+    # the split columns are only used by the question-based transforms
+    if not need_split:
+        return data_df
+
+    # remove the response starts (every option at once, before splitting)
+    responses = data_df[response_col].str.replace(question_start_regex(remove_start_len, response_options_delim), '', regex=True)
+    splits = responses.str.split(response_options_delim, regex=False)
+
+    # maybe shuffle, then clean and extract the correct responses in a single pass
     if shuffle:
-        def split_shuffle(row):
-            lst = row.split(response_options_delim)
-            random.shuffle(lst)
-            return lst
-        
-        data_df['split_responses'] = data_df[response_col].apply(split_shuffle)
-    else:
-        data_df['split_responses'] = data_df[response_col].apply(lambda x: x.split(response_options_delim))
+        splits = shuffle_lists(splits, rng=np.random.default_rng(seed))
 
-    # remove the question starts
-    data_df['split_responses'] = data_df['split_responses'].apply(lambda x: [remove_question_start(x_i, remove_start_len) for x_i in x])
+    split_responses, split_correct_responses = [], []
+    for lst in splits:
+        cleaned = [x_i.replace(correct_in_response, "") for x_i in lst]
+        split_responses.append(cleaned)
+        split_correct_responses.append([c_i for x_i, c_i in zip(lst, cleaned) if correct_in_response in x_i])
 
-    # check for any correct responses
-    data_df['split_correct_responses'] = data_df['split_responses'].apply(lambda x: [x_i.replace(correct_in_response, "") for x_i in x if correct_in_response in x_i])
-
-    # remove the question starts
-    data_df['split_responses'] = data_df['split_responses'].apply(lambda x: [x_i.replace(correct_in_response, "") for x_i in x])    
+    data_df['split_responses'] = split_responses
+    data_df['split_correct_responses'] = split_correct_responses
 
     return data_df
 
 
+# longest first, so a multi-character entry wins over its own first character
+TEX_ESCAPE_REGEX = re.compile('|'.join(re.escape(x) for x in sorted(TEX_CHARS_ESCAPE, key=len, reverse=True)))
+
+# str.translate only maps single characters, otherwise change_tex_chars falls back to TEX_ESCAPE_REGEX
+TEX_TABLE = str.maketrans({x: f'\\{x}' for x in TEX_CHARS_ESCAPE}) if all(len(x) == 1 for x in TEX_CHARS_ESCAPE) else None
+
+# with a single character to escape (just '%' by default), a literal Series.str.replace beats the regex
+TEX_SINGLE_ESCAPE = TEX_CHARS_ESCAPE[0] if len(TEX_CHARS_ESCAPE) == 1 and len(TEX_CHARS_ESCAPE[0]) == 1 else None
+
+@lru_cache(maxsize=8192)
 def change_tex_chars(s: str) -> str:
     """
     Escape common LaTeX characters.
 
+    Memoized, since response options ("True", "A", ...) repeat a lot across questions.
+
     :param s: The string to modify
 
     :return: String with escaped characters
     """
-    for x in TEX_CHARS_ESCAPE:
-        s = s.replace(x, f'\\{x}')
-        
-    return s
+    if TEX_TABLE is None:
+        return TEX_ESCAPE_REGEX.sub(r'\\\g<0>', s)
+    return s.translate(TEX_TABLE)
+
+
+def escape_tex_series(s: pd.Series) -> pd.Series:
+    """
+    Escape common LaTeX characters over a whole Series (vectorized change_tex_chars).
+
+    :param s: The Series of strings to modify
+
+    :return: Series with escaped characters
+    """
+    if TEX_SINGLE_ESCAPE is not None:
+        return s.str.replace(TEX_SINGLE_ESCAPE, '\\' + TEX_SINGLE_ESCAPE, regex=False)
+    return s.str.replace(TEX_ESCAPE_REGEX, r'\\\g<0>', regex=True)
+
+def escape_tex_lists(s: pd.Series) -> list:
+    """
+    Escape common LaTeX characters in every list of a Series (e.g. the split responses).
+
+    :param s: Series of lists of strings
+
+    :return: List of escaped lists (in the order of s)
+    """
+    # memoized per item, since response options ("True", "A", ...) repeat a lot across questions
+    return [[change_tex_chars(x) for x in lst] for lst in s]
+
+def escape_tex_columns(data_df: pd.DataFrame, title_col: str = 'Activity title', responses: bool = True) -> pd.DataFrame:
+    """
+    Escapes the title (and response) columns up front, so the row helpers can run with escape=False.
+
+    :param data_df: The dataframe
+    :param title_col: The column containing the question titles
+    :param responses: Whether or not to also escape the split (and correct) responses
+
+    :return: New dataframe with the same columns, escaped
+    """
+    # assigned by position, so the dataframe's index doesn't matter
+    escaped = {title_col: escape_tex_series(data_df[title_col]).to_numpy()}
+    if responses:
+        escaped['split_responses'] = escape_tex_lists(data_df['split_responses'])
+        escaped['split_correct_responses'] = escape_tex_lists(data_df['split_correct_responses'])
+
+    return data_df.assign(**escaped)
+
+def iter_rows(data_df: pd.DataFrame, columns: list = None):
+    """
+    Iterates over the dataframe rows as dicts (column -> value), without building a Series per row.
+
+    :param data_df: The dataframe
+    :param columns: The columns to include in each row (all of them if not given)
+
+    :return: Generator of row dicts
+    """
+    columns = list(data_df.columns) if columns is None else list(columns)
+    for values in data_df[columns].itertuples(index=False, name=None):
+        yield dict(zip(columns, values))
+
+def iter_joined(sep: str, parts):
+    """
+    Lazily yields the pieces of sep.join(parts), so they can be streamed with writelines.
+
+    :param sep: The separator
+    :param parts: Iterable of strings
+
+    :return: Generator of strings
+    """
+    parts = iter(parts)
+    for part in parts:
+        yield part
+        break
+    for part in parts:
+        yield sep
+        yield part
+
+
+@lru_cache(maxsize=None)
+def tex_option_affixes(
+        resp_opt_correct_block_type: str,
+        resp_opt_block_type: str,
+        end_spacing: int,
+        end_spacing_metric: str
+    ) -> tuple:
+    """
+    Builds the constant parts of a LaTeX response option line (formatted once per set of options).
+
+    :param resp_opt_correct_block_type: The LaTeX block type to use for the question response option (if correct)
+    :param resp_opt_block_type: The LaTeX block type to use for the question response option (if not correct)
+    :param end_spacing: The amount of space to add after each response option
+    :param end_spacing_metric: The metric for end_spacing
+
+    :return: (correct prefix, prefix, suffix)
+    """
+    suffix = rf"\\[{end_spacing}{end_spacing_metric}]"
+    return rf"\{resp_opt_correct_block_type} ", rf"\{resp_opt_block_type} ", suffix
 
 
 def tex_helper(
@@ -133,7 +314,8 @@ def tex_helper(
         resp_opt_correct_block_type: str = 'CorrectChoice',
         show_correct: bool = True,
         end_spacing: int = 4,
-        end_spacing_metric: str = 'pt'
+        end_spacing_metric: str = 'pt',
+        escape: bool = True
     ) -> str:
     """
     Converts the current row into a LaTeX block question.
@@ -146,6 +328,7 @@ def tex_helper(
     :param show_correct: Whether or not to show the solutions in the output
     :param end_spacing: The amount of space to add after each response option
     :param end_spacing_metric: The metric for end_spacing
+    :param escape: Whether or not to escape the LaTeX characters (False if the row comes from escape_tex_columns)
 
     :return: The string representing the LaTeX block
     """
@@ -153,25 +336,81 @@ def tex_helper(
     strbuilder = []
 
     title = row[title_col]
-    title = change_tex_chars(title)
+    if escape:
+        title = change_tex_chars(title)
 
     strbuilder.append(r'\begin{' + block_type + r'}')
     strbuilder.append(title)
     strbuilder.append(r'\end{' + block_type + r'}\\')
 
+    # nothing is marked correct when the solutions are hidden
+    correct = frozenset(row['split_correct_responses']) if show_correct else frozenset()
+    correct_prefix, prefix, suffix = tex_option_affixes(resp_opt_correct_block_type, resp_opt_block_type, end_spacing, end_spacing_metric)
+
     strbuilder.append(r'\begin{' + resp_block_type + r'}')
     for resp in row['split_responses']:
-        resp_new = change_tex_chars(resp)
-        if resp in row['split_correct_responses'] and show_correct:
-            strbuilder.append(rf"\{resp_opt_correct_block_type} {resp_new}\\[{end_spacing}{end_spacing_metric}]")
+        resp_new = change_tex_chars(resp) if escape else resp
+        if resp in correct:
+            strbuilder.append(correct_prefix + resp_new + suffix)
         else:
-            strbuilder.append(rf"\{resp_opt_block_type} {resp_new}\\[{end_spacing}{end_spacing_metric}]")
+            strbuilder.append(prefix + resp_new + suffix)
 
     strbuilder.append(r'\end{' + resp_block_type + r'}' + "\n")
 
     return "\n".join(strbuilder)
 
-def to_tex_exam(data_df: pd.DataFrame, output_file: str, encoding: str = None, show_correct: bool = True, **kwargs):
+def check_columns(data_df: pd.DataFrame, columns: list):
+    """
+    Makes sure the dataframe has the columns a report is built from (checked once, before any work).
+
+    :param data_df: The dataframe
+    :param columns: The columns the report needs
+
+    :raises ValueError: If any of the columns are missing
+    """
+    missing = [c for c in columns if c not in data_df.columns]
+    if missing:
+        raise ValueError(f"Column(s) {', '.join(map(repr, missing))} couldn't be found, can't continue.")
+
+def render_rows(data_df: pd.DataFrame, helper, columns: list, **kwargs) -> list:
+    """
+    Renders every row of the dataframe with a row helper (module level, so it can run in a worker process).
+
+    :param data_df: The dataframe
+    :param helper: The row helper, e.g. tex_helper or html_helper
+    :param columns: The columns the helper reads
+    :param kwargs: Keyword arguments for the helper
+
+    :return: List of rendered blocks, in the order of data_df
+    """
+    return list(map(partial(helper, **kwargs), iter_rows(data_df, columns)))
+
+def render_blocks(helper, data_df: pd.DataFrame, columns: list, n_jobs: int = None, **kwargs):
+    """
+    Renders the blocks of a report, split over worker processes for large dataframes.
+
+    :param helper: The (module level) row helper, e.g. tex_helper or html_helper
+    :param data_df: The dataframe
+    :param columns: The columns the helper reads
+    :param n_jobs: How many processes to render with (in this process if not given, or below PARALLEL_MIN_ROWS)
+    :param kwargs: Keyword arguments for the helper
+
+    :return: Iterable of rendered blocks, in the order of data_df
+    """
+    if n_jobs is None or n_jobs <= 1 or len(data_df) < PARALLEL_MIN_ROWS:
+        # bind the options once, and render lazily while the blocks are written
+        return map(partial(helper, **kwargs), iter_rows(data_df, columns))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # contiguous slices, so concatenating the results keeps the row order
+    bounds = np.linspace(0, len(data_df), n_jobs + 1, dtype=int)
+    slices = [data_df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(itertools.chain.from_iterable(pool.map(partial(render_rows, helper=helper, columns=columns, **kwargs), slices)))
+
+def to_tex_exam(data_df: pd.DataFrame, output_file: str, encoding: str = None, show_correct: bool = True, n_jobs: int = None, **kwargs):
     """
     Converts the CSV dataframe into a LaTeX exam report.
 
@@ -179,35 +418,41 @@ def to_tex_exam(data_df: pd.DataFrame, output_file: str, encoding: str = None, s
     :param output_file: The file to output to (.TeX)
     :param encoding: The encoding to use when outputting
     :param show_correct: Whether or not to show the solutions in the output
+    :param n_jobs: How many processes to render the blocks with (see render_blocks)
     :param kwargs: keyword arguments for every tex block
     """
 
-    try: 
+    title_col = kwargs.pop('title_col', 'Activity title')
+    check_columns(data_df, [title_col, 'split_responses', 'split_correct_responses'])
 
-        lst = data_df.apply(lambda x: tex_helper(x, show_correct=show_correct, **kwargs), axis=1)
+    data_df = escape_tex_columns(data_df, title_col=title_col)
+    columns = [title_col, 'split_responses', 'split_correct_responses']
+    blocks = render_blocks(tex_helper, data_df, columns, n_jobs=n_jobs, title_col=title_col, show_correct=show_correct, escape=False, **kwargs)
 
-        tex_gen = r'''
+    tex_head = r'''
 \documentclass{exam}         
 \begin{document}
 
 \begin{questions}
-''' + '\n'.join(lst) + r'''
+'''
+    tex_tail = r'''
 \end{questions}
 
 \end{document}
         '''
 
-        with open(output_file, 'w', encoding=encoding) as out_file:
-            
-            out_file.write(tex_gen)
+    # stream the blocks between the head and tail, instead of joining the whole document first
+    with open(output_file, 'w', encoding=encoding, buffering=WRITE_BUFFERING) as out_file:
+        out_file.write(tex_head)
+        out_file.writelines(iter_joined('\n', blocks))
+        out_file.write(tex_tail)
 
-    except KeyError:
-        raise ValueError("Column couldn't be found, can't continue.")
     
 def text_helper(
         row,
         title_col: str = 'Activity title',
         show_correct: bool = True,
+        escape: bool = True,
         **kwargs
     ) -> str:
     """
@@ -215,6 +460,7 @@ def text_helper(
 
     :param row: The current dataframe row
     :param show_correct: Whether or not to show the solutions in the output
+    :param escape: Whether or not to escape the title (False if the row comes from escape_tex_columns)
 
     :return: The string representing the LaTeX block
     """
@@ -222,7 +468,8 @@ def text_helper(
     strbuilder = []
 
     title = row[title_col]
-    title = change_tex_chars(title)
+    if escape:
+        title = change_tex_chars(title)
 
     strbuilder.append(f"Question:\n{title}\n\nOptions:\n")
     
@@ -253,17 +500,18 @@ def to_txt_exam(data_df: pd.DataFrame, output_file: str, encoding: str = None, s
     :param kwargs: keyword arguments for every tex block
     """
 
-    try: 
-
-        lst = data_df.apply(lambda x: text_helper(x, show_correct=show_correct, **kwargs), axis=1)
+    title_col = kwargs.pop('title_col', 'Activity title')
+    columns = [title_col, 'split_responses', 'split_correct_responses']
+    check_columns(data_df, columns)
 
-        text_gen = '\n'.join(lst)
+    data_df = escape_tex_columns(data_df, title_col=title_col, responses=False)
+    # bind the options once, instead of re-packing the kwargs on every row
+    render = partial(text_helper, title_col=title_col, show_correct=show_correct, escape=False, **kwargs)
+    blocks = map(render, iter_rows(data_df, columns))
 
-        with open(output_file, 'w', encoding=encoding) as out_file:
-            out_file.write(text_gen)
+    with open(output_file, 'w', encoding=encoding, buffering=WRITE_BUFFERING) as out_file:
+        out_file.writelines(iter_joined('\n', blocks))
 
-    except KeyError:
-        raise ValueError("Column couldn't be found, can't continue.")
     
 
 def html_helper(
@@ -291,8 +539,7 @@ def html_helper(
 
     strbuilder = []
 
-    title = row[title_col]
-    title = change_tex_chars(title)
+    title = html.escape(row[title_col], quote=False)
 
     question_ID = str(uuid.uuid4())
 
@@ -301,50 +548,51 @@ def html_helper(
     strbuilder.append(rf'{tabs(tab_start)}<div class="{group_class}">')
     strbuilder.append(f'{tabs(tab_start+1)}<p class="{question_class}" data-linked-id="{question_ID}">{title}</p>')
     strbuilder.append(f'{tabs(tab_start+1)}<ol type="a" class="{response_options_class}" data-linked-id="{question_ID}">')
+    correct = frozenset(row['split_correct_responses'])
+    correct_open = f'{tabs(tab_start+2)}<li class="{correct_class}">' if show_correct else f'{tabs(tab_start+2)}<li>'
+    incorrect_open = f'{tabs(tab_start+2)}<li class="{incorrect_class}">'
+
     for resp in row['split_responses']:
-        resp_new = resp
-        if resp in row['split_correct_responses']:
-            if show_correct:
-                strbuilder.append(f'{tabs(tab_start+2)}<li class="{correct_class}">{resp_new}</li>')
-            else:
-                strbuilder.append(f'{tabs(tab_start+2)}<li>{resp_new}</li>')
-        else:
-            strbuilder.append(f'{tabs(tab_start+2)}<li class="{incorrect_class}">{resp_new}</li>')
+        resp_new = html.escape(resp, quote=False)
+        strbuilder.append((correct_open if resp in correct else incorrect_open) + resp_new + '</li>')
 
     strbuilder.append(f'{tabs(tab_start+1)}</ol>')
     strbuilder.append(f'{tabs(tab_start)}</div>\n')
 
     return "\n".join(strbuilder)
 
-def to_html_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, quiz_mode: bool = False, encoding: str = None):
+def to_html_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, quiz_mode: bool = False, encoding: str = None, title_col: str = 'Activity title', n_jobs: int = None):
     """
     Converts the CSV dataframe into a LaTeX exam report.
 
     :param data_df: The dataframe
     :param output_file: The file to output to (.TeX)
     :param encoding: The encoding to use when outputting
+    :param title_col: The column containing the question titles
+    :param n_jobs: How many processes to render the blocks with (see render_blocks)
     """
 
-    try: 
-        quiz_mode_script = ''
-        page_title = 'Extracted Polls'
-        page_heading = 'Polls Report'
-        page_bar = ''
-        if quiz_mode:
-            quiz_mode_script = "<script type='text/javascript' src='html-js.js'></script>"
-            page_title = 'Polls Quiz'
-            page_heading = 'Polls Quiz'
-            html_lst_values = data_df.apply(lambda x: html_helper(x, show_correct=show_correct), axis=1)
-            page_bar = f'''<div class='counter-bar'>
-            <p id='counter' data-maximum="{len(html_lst_values)}" data-curr="0">0/{len(html_lst_values)}</p>
+    check_columns(data_df, [title_col, 'split_responses', 'split_correct_responses'])
+
+    columns = [title_col, 'split_responses', 'split_correct_responses']
+    quiz_mode_script = ''
+    page_title = 'Extracted Polls'
+    page_heading = 'Polls Report'
+    page_bar = ''
+    if quiz_mode:
+        quiz_mode_script = "<script type='text/javascript' src='html-js.js'></script>"
+        page_title = 'Polls Quiz'
+        page_heading = 'Polls Quiz'
+        blocks = render_blocks(html_helper, data_df, columns, n_jobs=n_jobs, title_col=title_col, show_correct=show_correct)
+        page_bar = f'''<div class='counter-bar'>
+            <p id='counter' data-maximum="{len(data_df)}" data-curr="0">0/{len(data_df)}</p>
             <button class='reset'>Reset</button>
         </div>'''
 
-        else:
-            html_lst_values = data_df.apply(lambda x: html_helper(x, show_correct=show_correct, correct_class='correct-quiz-selected'), axis=1)
-        html_lst = '\n'.join(html_lst_values)
+    else:
+        blocks = render_blocks(html_helper, data_df, columns, n_jobs=n_jobs, title_col=title_col, show_correct=show_correct, correct_class='correct-quiz-selected')
 
-        html_gen = f'''
+    html_head = f'''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -359,7 +607,8 @@ def to_html_report(data_df: pd.DataFrame, output_file: str, show_correct: bool =
         <div class='center-div'>
             <h1>{page_heading}</h1>
         </div>          
-{html_lst}
+'''
+    html_tail = '''
         <div>
             <button class='reset' id='bottom-reset'>Reset Quiz</button>
         </div>
@@ -368,84 +617,97 @@ def to_html_report(data_df: pd.DataFrame, output_file: str, show_correct: bool =
 </html>
         '''
 
-        with open(output_file, 'w', encoding=encoding) as out_file:
-            out_file.write(html_gen)
+    with open(output_file, 'w', encoding=encoding, buffering=WRITE_BUFFERING) as out_file:
+        out_file.write(html_head)
+        out_file.writelines(iter_joined('\n', blocks))
+        out_file.write(html_tail)
 
-    except KeyError:
-        raise ValueError("Column couldn't be found, can't continue.")
     
-def to_markdown_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, encoding: str = None):
+MD_ESCAPE_REGEX = re.compile(r'([\\`*_\[\]#<&])')
+
+def md_helper(
+        row,
+        title_col: str = 'Activity title',
+        show_correct: bool = True,
+        **kwargs
+    ) -> str:
     """
-    Converts the CSV dataframe into a LaTeX exam report.
+    Converts the current row into a Markdown block (heading and a bullet per response, correct ones in bold).
+
+    :param row: The current dataframe row
+    :param title_col: The column containing the question title
+    :param show_correct: Whether or not to show the solutions in the output
+
+    :return: The string representing the Markdown block
+    """
+
+    escape = lambda x: MD_ESCAPE_REGEX.sub(r'\\\1', x.strip())
+
+    strbuilder = []
+
+    strbuilder.append(f"### {escape(row[title_col])}\n")
+
+    correct = frozenset(row['split_correct_responses']) if show_correct else frozenset()
+
+    for resp in row['split_responses']:
+        if resp in correct:
+            strbuilder.append(f"- **{escape(resp)}**")
+        else:
+            strbuilder.append(f"- {escape(resp)}")
+
+    strbuilder.append("")
+
+    return "\n".join(strbuilder)
+
+def to_markdown_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, encoding: str = None, title_col: str = 'Activity title'):
+    """
+    Converts the CSV dataframe into a Markdown report.
 
     :param data_df: The dataframe
-    :param output_file: The file to output to (.TeX)
+    :param output_file: The file to output to (.md)
     :param encoding: The encoding to use when outputting
+    :param title_col: The column containing the question titles
     """
-    import markdownify
 
-    name, _ = os.path.splitext(output_file)
+    render = partial(md_helper, title_col=title_col, show_correct=show_correct)
+    blocks = map(render, iter_rows(data_df, [title_col, 'split_responses', 'split_correct_responses']))
 
-    html_lst =  '\n'.join(data_df.apply(lambda x: html_helper(x, show_correct=show_correct), axis=1))
+    with open(output_file, 'w', encoding=encoding, buffering=WRITE_BUFFERING) as out_file:
+        out_file.write("# PollEverywhere Report\n\n")
+        out_file.writelines(iter_joined('\n', blocks))
 
-    html_gen = f'''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <script src="https://code.jquery.com/jquery-3.6.0.min.js" integrity="sha384-KyZXEAg3QhqLMpG8r+Knujsl5/1zwaQ7wxt2NN9138DhxUeK5l/5Vp1+XWlFm_tv" crossorigin="anonymous"></script>
-    <link rel="stylesheet" href="https://fonts.googleapis.com/css?family=Raleway&display=swap" />
-    <link rel="stylesheet" href="html-styles.css">
-    <title>{name}</title>
-</head> 
-<body>
-    <div class='center-container'>
-        <div class='center-div'>
-            <h1>PollEverywhere Report</h1>
-        </div>          
-{html_lst}
-    </div>
-</body>
-</html>
-        '''
 
-    md_str = markdownify.markdownify(html_gen)
-    with open(output_file, 'w', encoding=encoding) as out_file:
-        out_file.write(md_str)
+def parse_frame(data_df: pd.DataFrame, question_col: str = 'Activity title') -> pd.DataFrame:
+    """
+    Projects the parsed questions into three parallel columns (one record per question in to_dict_style).
 
+    :param data_df: The dataframe
+    :param question_col: The column containing the question titles
 
-def dict_helper(row, show_correct: bool = True, question_col: str = 'Activity title'):
+    :return: Dataframe with 'title', 'responses' and 'correct' columns (same index as data_df)
     """
-    To Dict helper.
 
-    """
+    cols = {question_col: 'title', 'split_responses': 'responses', 'split_correct_responses': 'correct'}
+    return data_df[list(cols)].rename(columns=cols)
 
-    return {
-        'title': row[question_col],
-        'responses': row['split_responses'],
-        'correct': row['split_correct_responses']
-    } if show_correct else {
-        'title': row[question_col],
-        'responses': row['split_responses']
-    }
-    
 
-def to_dict_style(data_df: pd.DataFrame, show_correct: bool = True, root_name: str = None):
+def to_dict_style(data_df: pd.DataFrame, show_correct: bool = True, root_name: str = None, question_col: str = 'Activity title', parsed: pd.DataFrame = None):
     """
     Converts the CSV dataframe into a DICT report.
 
     :param data_df: The dataframe
     :param show_correct: Whether or not to show the correct answer
+    :param question_col: The column containing the question titles
+    :param parsed: The output of parse_frame, to share between reports (built from data_df if not given)
     """
 
-    dct = {}
-    i = 1
-
-    def help(row): 
-        nonlocal i, dct, show_correct
-        dct[f'{i}'] = dict_helper(row, show_correct=show_correct)
-        i += 1
+    records = parse_frame(data_df, question_col=question_col) if parsed is None else parsed
+    # drop or copy, so the shared frame keeps its index and columns
+    records = records.drop(columns='correct') if not show_correct else records.copy(deep=False)
 
-    data_df.apply(lambda x: help(x), axis=1)
+    # numbered from 1 as string keys, then one to_dict call builds the nested dict
+    records.index = pd.RangeIndex(1, len(records) + 1).astype(str)
+    dct = records.to_dict(orient='index')
     
     if root_name is not None:
         new_dct = {
@@ -457,7 +719,7 @@ def to_dict_style(data_df: pd.DataFrame, show_correct: bool = True, root_name: s
     return new_dct
 
 
-def to_yaml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, root_name: str = 'questions', encoding: str = None):
+def to_yaml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, root_name: str = 'questions', encoding: str = None, parsed: pd.DataFrame = None):
     """
     Output to yaml format.
 
@@ -466,30 +728,47 @@ def to_yaml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool =
     :param show_correct: Whether or not to show the solutions in the output
     :param root_name: The key for the root of the tree
     :param encoding: The encoding to write the file with
+    :param parsed: The output of parse_frame, to share between reports (built from data_df if not given)
     """
 
-    dct = to_dict_style(data_df, show_correct=show_correct, root_name=root_name)
+    dct = to_dict_style(data_df, show_correct=show_correct, root_name=root_name, parsed=parsed)
 
     with open(output_file, 'w', encoding=encoding) as out_file:
-        yaml.dump(dct, out_file,default_flow_style=False)
+        yaml.dump(dct, out_file, Dumper=YAML_DUMPER, default_flow_style=False)
 
-def to_json_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, root_name: str = 'questions', encoding: str = None):
+def to_json_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, root_name: str = 'questions', encoding: str = None, parsed: pd.DataFrame = None):
     """
     Output to JSON format.
 
+    With orjson installed and a UTF-8 encoding, the file is written by orjson: compact (no spaces after ',' and ':')
+    and with non-ASCII characters as-is. Otherwise json.dump's default formatting is used (non-ASCII escaped).
+
     :param data_df: The PollEv results
     :param output_file: Filepath to output to (.json must be used)
     :param show_correct: Whether or not to show the solutions in the output
     :param root_name: The key for the root of the tree
     :param encoding: The encoding to write the file with
+    :param parsed: The output of parse_frame, to share between reports (built from data_df if not given)
     """
 
-    dct = to_dict_style(data_df, show_correct=show_correct, root_name=root_name)
+    try:
+        import orjson       # optional, serializes in C
+    except ImportError:
+        orjson = None
 
+    dct = to_dict_style(data_df, show_correct=show_correct, root_name=root_name, parsed=parsed)
+
+    if orjson is not None and encoding is not None and codecs.lookup(encoding).name == 'utf-8':
+        # orjson only produces UTF-8 bytes, so write them as they are
+        with open(output_file, 'wb') as out_file:
+            out_file.write(orjson.dumps(dct))
+        return
+
+    # any other encoding: json.dump escapes non-ASCII characters, so it can be written with every codec
     with open(output_file, 'w', encoding=encoding) as out_file:
         json.dump(dct, out_file)
 
-def to_toml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, question_prefix: str = 'question', encoding: str = None):
+def to_toml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, question_prefix: str = 'question', encoding: str = None, parsed: pd.DataFrame = None):
     """
     Output to TOML format.
 
@@ -498,14 +777,21 @@ def to_toml_report(data_df: pd.DataFrame, output_file: str, show_correct: bool =
     :param show_correct: Whether or not to show the solutions in the output
     :param question_prefix: The key used in each question
     :param encoding: The encoding to write the file with
+    :param parsed: The output of parse_frame, to share between reports (built from data_df if not given)
     """
 
-    import toml
+    try:
+        import tomli_w      # optional, faster writer than toml
+    except ImportError:
+        tomli_w = None
 
-    dct = to_dict_style(data_df, show_correct=show_correct, root_name = question_prefix)
+    dct = to_dict_style(data_df, show_correct=show_correct, root_name=question_prefix, parsed=parsed)
 
     with open(output_file, 'w', encoding=encoding) as out_file:
-        toml.dump(dct, out_file)
+        if tomli_w is not None:
+            out_file.write(tomli_w.dumps(dct))
+        else:
+            toml.dump(dct, out_file)
 
 def to_csv_report(data_df: pd.DataFrame, output_file: str, show_correct: bool = True, encoding: str = None):
     """
@@ -537,18 +823,23 @@ def update_defaults(args, defaults: dict) -> dict:
 
 def update_defaults_config(defaults, config, section) -> dict:
     """
-    Makes a new dict based on the intersection of the args and defaults.
+    Makes a new dict based on the intersection of the config section and defaults.
 
-    :param args: Newly input args (Namespace)
     :param defaults: Dict containing default values
+    :param config: The parsed configuration file (ConfigParser)
+    :param section: The section of the configuration file to read
     :return: new defaults
     """
 
+    # read the section once, instead of a get (and getboolean) lookup per key
+    sect = dict(config.items(section)) if config.has_section(section) else {}
+    booleans = configparser.ConfigParser.BOOLEAN_STATES
+
     kw = {}
-    for k in defaults.keys():
-        kw[k] = config.get(section, k, fallback=defaults[k])
-        if kw[k] == 'yes' or kw[k] == 'no' or kw=='true' or kw=='false':        # convert booleans from the config file
-            kw[k] = config.getboolean(section, k, fallback=defaults[k]) 
+    for k, default in defaults.items():
+        kw[k] = sect.get(k, default)
+        if isinstance(kw[k], str) and (isinstance(default, bool) or kw[k].lower() in ('yes', 'no', 'true', 'false')):        # convert booleans from the config file
+            kw[k] = booleans.get(kw[k].lower(), default)
     return kw
 
 def main():
@@ -619,7 +910,8 @@ def main():
     config_args, remaining_argv = config_parser.parse_known_args()
     default_io_opts['config'] = config_args.config_path
 
-    try:
+    # ConfigParser.read skips a missing file silently, so only parse it (and merge the sections) when there is one
+    if default_io_opts['config'] and os.path.isfile(default_io_opts['config']):
         config = configparser.ConfigParser()
         config.read(default_io_opts['config'])
 
@@ -651,10 +943,6 @@ def main():
         elif default_io_opts['transform'] == 'markdown' and 'pollev_transforms.md' in config:
             default_md_opts.update(update_defaults_config(default_csv_opts, config, 'pollev_transforms.md'))
 
-    except FileNotFoundError:
-        parser.set_defaults(transform=default_io_opts['transform'])
-        args, _ = parser.parse_known_args(remaining_argv)
-        pass
 
     global_parser = argparse.ArgumentParser(description='Read CSV file with optional screen name filter', add_help=False)
     global_parser.add_argument('--config_path', type=str, help='Path to the configuration file (optional)', default=default_io_opts['config'])
@@ -665,6 +953,9 @@ def main():
     global_parser.add_argument('--output_path', type=str, help='Path for output file (optional)', default=default_io_opts['output_path'])
     global_parser.add_argument('--encoding', type=str, help='Encoding for reading and writing (optional)', default=default_io_opts['encoding'])
     global_parser.add_argument('--noshuffle', help="Don't shuffle the response options (optional)", default=(not default_io_opts['shuffle_responses']), action='store_true')
+    global_parser.add_argument('--engine', type=str, help='CSV parser engine (optional)', choices=['c', 'python', 'pyarrow'], default=None)
+    global_parser.add_argument('--n_jobs', type=int, help='Processes to render the tex/html blocks with, for large files (optional)', default=None)
+    global_parser.add_argument('--seed', type=int, help='Seed for shuffling the response options, for reproducible output (optional)', default=None)
     global_parser.add_argument('--remove_start_len', type=int, help='How far into the string to look when removing the question or response prefix (optional)', default=default_io_opts['remove_start_len'])
 
     # parser for the required file path
@@ -711,7 +1002,7 @@ def main():
     parser.set_defaults(transform=default_io_opts['transform'])
     args = parser.parse_args(remaining_argv)
 
-    data_df = read_csv_file(args.file_path, presenter=args.presenter, encoding=args.encoding, rhidden=args.remove_hidden, rimages=args.remove_images, shuffle=(not args.noshuffle), remove_start_len=args.remove_start_len)
+    data_df = read_csv_file(args.file_path, presenter=args.presenter, encoding=args.encoding, rhidden=args.remove_hidden, rimages=args.remove_images, shuffle=(not args.noshuffle), seed=args.seed, remove_start_len=args.remove_start_len, engine=args.engine, need_split=(args.transform != 'csv'), trim_columns=(args.transform != 'csv'))
 
     name, _ = os.path.splitext(args.file_path)
 
@@ -720,7 +1011,7 @@ def main():
     # check transform type
     
     if args.transform == 'tex':
-        to_tex_exam(data_df, os.path.join(args.output_path, f'{name}.tex'), encoding=args.encoding, show_correct=show_correct, **update_defaults(args, default_tex_opts))
+        to_tex_exam(data_df, os.path.join(args.output_path, f'{name}.tex'), encoding=args.encoding, show_correct=show_correct, n_jobs=args.n_jobs, **update_defaults(args, default_tex_opts))
     elif args.transform == 'yaml':
         to_yaml_report(data_df, os.path.join(args.output_path, f'{name}.yaml'), encoding=args.encoding, show_correct=show_correct, **update_defaults(args, default_yaml_opts))
     elif args.transform == 'json':
@@ -736,7 +1027,7 @@ def main():
         except Exception:
             pass
         
-        to_html_report(data_df, os.path.join(html_path, f'{name}.html'), encoding=args.encoding, show_correct=show_correct, **update_defaults(args, default_html_opts))
+        to_html_report(data_df, os.path.join(html_path, f'{name}.html'), encoding=args.encoding, show_correct=show_correct, n_jobs=args.n_jobs, **update_defaults(args, default_html_opts))
         
         # copy over the CSS and JS file
         try: